@@ -52,6 +52,8 @@ from google_keyword_search import (
     find_and_click_result, 
     go_to_next_page
 )
+from rank_history import DEFAULT_HISTORY_DB, open_history_db, append_batch
+from rank_alerts import DEFAULT_ALERTS_OUTBOX, load_rules, process_run_alerts
 
 # 設置日誌
 logging.basicConfig(
@@ -286,6 +288,36 @@ def process_keyword_pair(driver, search_query, target_keywords, max_pages=10, se
     return results, all_keywords_processed, driver_died # NEW: Return driver_died status
 
 
+def record_history_and_alerts(all_results_summary, history_db, alert_rules=None, alerts_outbox=DEFAULT_ALERTS_OUTBOX):
+    """將本次批量搜索結果寫入排名歷史，並只針對本批次的記錄檢查排名提醒"""
+    try:
+        conn = open_history_db(history_db)
+    except Exception as e:
+        logging.error(f"打開排名歷史資料庫時出錯: {e}", exc_info=True)
+        print(f"❌ 打開排名歷史資料庫時出錯: {e}")
+        return
+
+    try:
+        run_id = append_batch(conn, all_results_summary)
+        print(f"\n💾 搜尋結果已寫入排名歷史: {history_db} (批次: {run_id})")
+    except Exception as e:
+        logging.error(f"寫入排名歷史時出錯: {e}", exc_info=True)
+        print(f"❌ 寫入排名歷史時出錯: {e}")
+        conn.close()
+        return
+
+    # 排名歷史已寫入，提醒失敗不影響本批次記錄
+    try:
+        alerts = process_run_alerts(conn, run_id, alert_rules, alerts_outbox)
+        if alerts:
+            print(f"🔔 產生 {len(alerts)} 則排名提醒，已寫入 {alerts_outbox}")
+    except Exception as e:
+        logging.error(f"檢查排名提醒時出錯: {e}", exc_info=True)
+        print(f"❌ 檢查排名提醒時出錯: {e}")
+    finally:
+        conn.close()
+
+
 def main():
     print("DEBUG: Entered main function") # DEBUG
     parser = argparse.ArgumentParser(
@@ -295,6 +327,10 @@ def main():
     )
     parser.add_argument("csv_file", help="包含搜尋關鍵字和目標關鍵字的CSV檔案路徑")
     parser.add_argument("max_pages", type=int, nargs='?', default=10, help="最大搜尋頁數 (預設: 10)")
+    parser.add_argument("--history-db", default=DEFAULT_HISTORY_DB, help=f"排名歷史資料庫路徑 (預設: {DEFAULT_HISTORY_DB})")
+    parser.add_argument("--no-history", action="store_true", help="不寫入排名歷史，也不檢查排名提醒")
+    parser.add_argument("--alert-rules", help="排名提醒規則JSON檔案路徑 (預設使用內建規則)")
+    parser.add_argument("--alerts-outbox", default=DEFAULT_ALERTS_OUTBOX, help=f"排名提醒發件箱路徑 (預設: {DEFAULT_ALERTS_OUTBOX})")
 
     args = parser.parse_args()
 
@@ -303,6 +339,16 @@ def main():
         print("❌ 最大頁數必須是正整數")
         sys.exit(1)
 
+    # 在開始搜索前檢查提醒規則，避免長時間搜索後才發現規則檔案有誤
+    alert_rules = None
+    if not args.no_history:
+        try:
+            alert_rules = load_rules(args.alert_rules)
+        except (OSError, ValueError) as e:
+            logging.error(f"讀取排名提醒規則失敗: {e}")
+            print(f"❌ 讀取排名提醒規則失敗: {e}")
+            sys.exit(1)
+
     keyword_pairs = read_csv_keywords(args.csv_file)
     print(f"DEBUG: After read_csv_keywords, keyword_pairs: {keyword_pairs}") # DEBUG
     if not keyword_pairs:
@@ -519,6 +565,10 @@ def main():
                 for detail in target_details_list:
                     print(f"    🎯 目標 '{detail['target']}': {detail['status']}")
     
+    # 寫入排名歷史並檢查排名提醒
+    if all_results_summary and not args.no_history:
+        record_history_and_alerts(all_results_summary, args.history_db, alert_rules, args.alerts_outbox)
+
     print(f"\n{'='*60}")
     print("👋 搜尋程序結束")
     print(f"{'='*60}\n")
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+排名提醒
+
+每次批量搜索寫入排名歷史後，依照規則比對本批次與同一關鍵字上一次的結果，
+將觸發的提醒追加到本地JSONL發件箱。只檢查本批次寫入的記錄，並透過索引讀取上一筆，
+不會重新掃描整個歷史。
+
+使用方法:
+    python rank_alerts.py [--run-id RUN_ID] [--history-db DB] [--rules RULES_JSON] [--outbox OUTBOX]
+
+規則檔案為JSON列表，例如:
+    [
+        {"name": "drop_2_pages", "type": "page_drop", "min_pages": 2},
+        {"name": "left_page_1", "type": "left_page", "page": 1},
+        {"name": "lost", "type": "lost"}
+    ]
+
+規則類型:
+    - page_drop: 排名下跌至少 min_pages 頁
+    - left_page: 上次在第 page 頁以內，本次掉出（包括未找到）
+    - lost: 上次找到，本次在搜尋頁數內未找到
+    - found: 上次未找到，本次找到
+"""
+
+import sys
+import json
+import logging
+import argparse
+import datetime
+from pathlib import Path
+
+from rank_history import (
+    DEFAULT_HISTORY_DB,
+    STATUS_FOUND,
+    STATUS_NOT_FOUND,
+    open_history_db,
+    fetch_run,
+    fetch_previous,
+    latest_run_id,
+    run_exists,
+)
+
+# 設置日誌
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+DEFAULT_ALERTS_OUTBOX = "results/alerts_outbox.jsonl"
+
+DEFAULT_RULES = [
+    # left_page_1 已涵蓋 1 -> 2 頁的變化，page_drop 只提醒跨越多頁的下跌
+    {"name": "page_drop", "type": "page_drop", "min_pages": 2},
+    {"name": "left_page_1", "type": "left_page", "page": 1},
+    {"name": "lost", "type": "lost"},
+]
+
+
+def _rule_page_drop(rule, current, previous):
+    if current["status"] != STATUS_FOUND or previous["status"] != STATUS_FOUND:
+        return None
+    drop = current["page"] - previous["page"]
+    if drop >= rule.get("min_pages", 1):
+        return f"排名從第 {previous['page']} 頁下跌到第 {current['page']} 頁"
+    return None
+
+
+def _rule_left_page(rule, current, previous):
+    page = rule.get("page", 1)
+    if previous["status"] != STATUS_FOUND or previous["page"] > page:
+        return None
+    if current["status"] == STATUS_NOT_FOUND or current["page"] > page:
+        return f"已掉出第 {page} 頁（上次在第 {previous['page']} 頁）"
+    return None
+
+
+def _rule_lost(rule, current, previous):
+    if previous["status"] == STATUS_FOUND and current["status"] == STATUS_NOT_FOUND:
+        return f"上次在第 {previous['page']} 頁，本次未找到"
+    return None
+
+
+def _rule_found(rule, current, previous):
+    if previous["status"] == STATUS_NOT_FOUND and current["status"] == STATUS_FOUND:
+        return f"上次未找到，本次在第 {current['page']} 頁找到"
+    return None
+
+
+RULE_TYPES = {
+    "page_drop": _rule_page_drop,
+    "left_page": _rule_left_page,
+    "lost": _rule_lost,
+    "found": _rule_found,
+}
+
+
+def load_rules(rules_file=None):
+    """讀取規則檔案，未指定時返回預設規則；空列表表示不檢查任何規則"""
+    if not rules_file:
+        return DEFAULT_RULES
+    with open(rules_file, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    if not isinstance(rules, list):
+        raise ValueError("規則檔案必須是JSON列表")
+    for rule in rules:
+        if not isinstance(rule, dict) or rule.get("type") not in RULE_TYPES:
+            raise ValueError(f"未知的規則類型: {rule.get('type') if isinstance(rule, dict) else rule}")
+        if "name" in rule and not isinstance(rule["name"], str):
+            raise ValueError(f"規則名稱必須是字串: {rule['name']!r}")
+        for param in ("min_pages", "page"):
+            value = rule.get(param)
+            if param in rule and (isinstance(value, bool) or not isinstance(value, int) or value <= 0):
+                raise ValueError(f"規則 {rule.get('name', rule['type'])} 的 {param} 必須是正整數: {value!r}")
+    return rules
+
+
+def evaluate_run(conn, run_id, rules=None):
+    """
+    對指定批次的記錄套用規則
+
+    返回：提醒字典列表
+    """
+    if rules is None:
+        rules = DEFAULT_RULES
+    alerts = []
+    for current in fetch_run(conn, run_id):
+        if current["status"] not in (STATUS_FOUND, STATUS_NOT_FOUND):
+            continue
+        previous = fetch_previous(conn, current)
+        if previous is None:
+            continue
+        for rule in rules:
+            message = RULE_TYPES[rule["type"]](rule, current, previous)
+            if message:
+                alerts.append({
+                    "rule": rule.get("name", rule["type"]),
+                    "run_id": run_id,
+                    "checked_at": current["checked_at"],
+                    "search_query": current["search_query"],
+                    "target_keyword": current["target_keyword"],
+                    "previous_page": previous["page"],
+                    "current_page": current["page"],
+                    "message": message,
+                })
+    return alerts
+
+
+def alert_key(alert):
+    """提醒的唯一鍵，同一批次重複評估時用於去除重複"""
+    return (alert["run_id"], alert["rule"], alert["search_query"], alert["target_keyword"])
+
+
+def _existing_alert_keys(outbox_path, run_id):
+    """逐行讀取發件箱，返回指定批次已寫入的提醒鍵"""
+    keys = set()
+    if not Path(outbox_path).exists():
+        return keys
+    with open(outbox_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                alert = json.loads(line)
+            except ValueError:
+                continue
+            if alert.get("run_id") == run_id:
+                keys.add(alert_key(alert))
+    return keys
+
+
+def write_alerts(alerts, outbox_path=DEFAULT_ALERTS_OUTBOX, dedupe=False):
+    """
+    將提醒追加到JSONL發件箱
+
+    參數:
+        dedupe: 是否跳過已存在於發件箱的提醒。重新評估舊批次時使用；
+                剛寫入的批次不可能已有提醒，不需要讀取整個發件箱
+
+    返回：實際寫入的提醒列表
+    """
+    if not alerts:
+        return []
+    new_alerts = alerts
+    if dedupe:
+        existing = set()
+        for run_id in {alert["run_id"] for alert in alerts}:
+            existing |= _existing_alert_keys(outbox_path, run_id)
+        new_alerts = [alert for alert in alerts if alert_key(alert) not in existing]
+        if not new_alerts:
+            return []
+
+    Path(outbox_path).parent.mkdir(parents=True, exist_ok=True)
+    created_at = datetime.datetime.now().isoformat(timespec="seconds")
+    with open(outbox_path, "a", encoding="utf-8") as f:
+        for alert in new_alerts:
+            f.write(json.dumps(dict(alert, created_at=created_at), ensure_ascii=False) + "\n")
+    return new_alerts
+
+
+def process_run_alerts(conn, run_id, rules=None, outbox_path=DEFAULT_ALERTS_OUTBOX, dedupe=False):
+    """評估指定批次並將提醒寫入發件箱，返回新寫入的提醒列表"""
+    alerts = write_alerts(evaluate_run(conn, run_id, rules), outbox_path, dedupe)
+    for alert in alerts:
+        logging.warning(f"排名提醒 [{alert['rule']}] {alert['search_query']} -> {alert['target_keyword']}: {alert['message']}")
+        print(f"🔔 [{alert['rule']}] {alert['search_query']} -> {alert['target_keyword']}: {alert['message']}")
+    return alerts
+
+
+def parse_arguments():
+    """解析命令行參數"""
+    parser = argparse.ArgumentParser(description="排名提醒 - 對排名歷史中的批次套用提醒規則")
+    parser.add_argument("--run-id", help="要評估的批次編號 (默認: 最近一次)")
+    parser.add_argument("--history-db", default=DEFAULT_HISTORY_DB, help=f"排名歷史資料庫路徑 (默認: {DEFAULT_HISTORY_DB})")
+    parser.add_argument("--rules", help="提醒規則JSON檔案路徑 (默認使用內建規則)")
+    parser.add_argument("--outbox", default=DEFAULT_ALERTS_OUTBOX, help=f"提醒發件箱路徑 (默認: {DEFAULT_ALERTS_OUTBOX})")
+
+    return parser.parse_args()
+
+
+def main():
+    """主函數"""
+    args = parse_arguments()
+
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as e:
+        logging.error(f"讀取提醒規則失敗: {e}")
+        print(f"❌ 讀取提醒規則失敗: {e}")
+        sys.exit(1)
+
+    if not Path(args.history_db).exists():
+        print(f"❌ 找不到排名歷史資料庫: {args.history_db}")
+        sys.exit(1)
+
+    conn = open_history_db(args.history_db)
+    try:
+        run_id = args.run_id or latest_run_id(conn)
+        if not run_id:
+            print("ⓘ 排名歷史中沒有任何批次")
+            return
+        if not run_exists(conn, run_id):
+            print(f"❌ 排名歷史中找不到批次: {run_id}")
+            sys.exit(1)
+        # 重新評估的批次可能已由批量搜索寫過提醒，需去除重複
+        alerts = process_run_alerts(conn, run_id, rules, args.outbox, dedupe=True)
+        print(f"✓ 批次 {run_id} 共產生 {len(alerts)} 則新提醒（已在發件箱中的提醒不會重複寫入）")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+排名歷史與快照壓縮工具
+
+依保留策略壓縮排名歷史資料庫與搜索快照檔案（results/search-results-*.json、
+reports/search-report-*.csv）。預設最近14天全部保留，90天內每天保留一筆，更早的每週保留一筆。
+壓縮以小交易逐個關鍵字進行，讀取端在壓縮期間仍可正常查詢。
+
+使用方法:
+    python rank_compact.py [--keep-all-days N] [--keep-daily-days N] [--vacuum] [--dry-run]
+
+例如:
+    python rank_compact.py
+    python rank_compact.py --keep-all-days 7 --keep-daily-days 60 --vacuum
+"""
+
+import os
+import re
+import sys
+import logging
+import argparse
+import datetime
+from pathlib import Path
+
+from rank_history import (
+    DEFAULT_HISTORY_DB,
+    DEFAULT_KEEP_ALL_DAYS,
+    DEFAULT_KEEP_DAILY_DAYS,
+    open_history_db,
+    compact_history,
+)
+
+# 設置日誌
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+# 搜索快照檔案位置（由 .github/scripts/search.js 產生，檔名時間為UTC）
+SNAPSHOT_PATTERNS = [
+    ("results", "search-results-"),
+    ("reports", "search-report-"),
+]
+
+_SNAPSHOT_TIME_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})T(\d{2})-(\d{2})-(\d{2})-\d{3}Z")
+
+
+def parse_snapshot_time(filename):
+    """從快照檔名解析時間，無法解析時返回None"""
+    match = _SNAPSHOT_TIME_PATTERN.search(filename)
+    if not match:
+        return None
+    date, hour, minute, second = match.groups()
+    return datetime.datetime.fromisoformat(f"{date}T{hour}:{minute}:{second}")
+
+
+def _snapshot_bucket(snapshot_time, daily_cutoff, weekly_cutoff):
+    """返回快照所屬的保留區段，None表示完整保留"""
+    if snapshot_time >= daily_cutoff:
+        return None
+    if snapshot_time >= weekly_cutoff:
+        return snapshot_time.strftime("%Y-%m-%d")
+    # 以該週星期一的日期表示，與 rank_history 的每週區段一致
+    week_start = snapshot_time.date() - datetime.timedelta(days=snapshot_time.weekday())
+    return f"W{week_start.isoformat()}"
+
+
+def compact_snapshots(base_dir=".", keep_all_days=DEFAULT_KEEP_ALL_DAYS, keep_daily_days=DEFAULT_KEEP_DAILY_DAYS,
+                      dry_run=False, now=None):
+    """
+    依保留策略刪除多餘的搜索快照檔案
+
+    每個快照包含同一批次所有搜尋詞的結果，因此以檔案為單位，在各時間區段內保留最新的一個。
+
+    返回：刪除（或在 dry_run 時將刪除）的檔案路徑列表
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    daily_cutoff = now - datetime.timedelta(days=keep_all_days)
+    weekly_cutoff = now - datetime.timedelta(days=keep_daily_days)
+
+    removed = []
+    for directory, prefix in SNAPSHOT_PATTERNS:
+        snapshot_dir = Path(base_dir) / directory
+        if not snapshot_dir.is_dir():
+            continue
+
+        # 每個區段只記住目前最新的檔案
+        newest_in_bucket = {}
+        with os.scandir(snapshot_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.startswith(prefix):
+                    continue
+                snapshot_time = parse_snapshot_time(entry.name)
+                if snapshot_time is None:
+                    continue
+                bucket = _snapshot_bucket(snapshot_time, daily_cutoff, weekly_cutoff)
+                if bucket is None:
+                    continue
+                kept = newest_in_bucket.get(bucket)
+                if kept is None or snapshot_time > kept[0]:
+                    newest_in_bucket[bucket] = (snapshot_time, entry.path)
+                    stale = kept[1] if kept else None
+                else:
+                    stale = entry.path
+                if stale:
+                    removed.append(stale)
+                    if not dry_run:
+                        os.remove(stale)
+
+    logging.info(f"快照壓縮完成，{'將刪除' if dry_run else '已刪除'} {len(removed)} 個檔案")
+    return removed
+
+
+def parse_arguments():
+    """解析命令行參數"""
+    parser = argparse.ArgumentParser(description="排名歷史與快照壓縮工具")
+    parser.add_argument("--history-db", default=DEFAULT_HISTORY_DB, help=f"排名歷史資料庫路徑 (默認: {DEFAULT_HISTORY_DB})")
+    parser.add_argument("--snapshot-dir", default=".", help="包含 results/ 與 reports/ 的目錄 (默認: 目前目錄)")
+    parser.add_argument("--keep-all-days", type=int, default=DEFAULT_KEEP_ALL_DAYS, help=f"完整保留的天數 (默認: {DEFAULT_KEEP_ALL_DAYS})")
+    parser.add_argument("--keep-daily-days", type=int, default=DEFAULT_KEEP_DAILY_DAYS, help=f"每天保留一筆的天數，更早的每週保留一筆 (默認: {DEFAULT_KEEP_DAILY_DAYS})")
+    parser.add_argument("--vacuum", action="store_true", help="執行完整 VACUUM 重建資料庫（期間會阻擋寫入）")
+    parser.add_argument("--dry-run", action="store_true", help="只列出將刪除的快照，不修改任何檔案（不壓縮排名歷史）")
+    parser.add_argument("--skip-history", action="store_true", help="不壓縮排名歷史資料庫")
+    parser.add_argument("--skip-snapshots", action="store_true", help="不壓縮搜索快照檔案")
+
+    return parser.parse_args()
+
+
+def main():
+    """主函數"""
+    args = parse_arguments()
+
+    if args.keep_all_days < 0 or args.keep_daily_days < args.keep_all_days:
+        logging.error("保留天數設定無效")
+        print("❌ 保留天數設定無效：天數不可為負數，且每日保留天數不可小於完整保留天數")
+        sys.exit(1)
+
+    print(f"\n🗜️ 保留策略: 最近 {args.keep_all_days} 天全部保留，{args.keep_daily_days} 天內每天一筆，更早的每週一筆")
+
+    if not args.skip_snapshots:
+        removed = compact_snapshots(args.snapshot_dir, args.keep_all_days, args.keep_daily_days, args.dry_run)
+        for path in removed:
+            print(f"  {'將刪除' if args.dry_run else '已刪除'}: {path}")
+        print(f"✓ 快照: {'將刪除' if args.dry_run else '已刪除'} {len(removed)} 個檔案")
+
+    if args.skip_history or args.dry_run:
+        return
+    if not Path(args.history_db).exists():
+        print(f"ⓘ 找不到排名歷史資料庫: {args.history_db}")
+        return
+
+    conn = open_history_db(args.history_db)
+    try:
+        deleted = compact_history(conn, args.keep_all_days, args.keep_daily_days, args.vacuum)
+        print(f"✓ 排名歷史: 已刪除 {deleted} 筆記錄")
+    except Exception as e:
+        logging.error(f"壓縮排名歷史時出錯: {e}", exc_info=True)
+        print(f"❌ 壓縮排名歷史時出錯: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
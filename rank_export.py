@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+排名歷史匯出工具
+
+從排名歷史資料庫分批讀取記錄並串流寫入CSV或Parquet，可依日期範圍、搜尋詞、目標關鍵字篩選，
+並只匯出指定欄位。記錄以固定大小分批處理，不會一次載入整個歷史。
+
+使用方法:
+    python rank_export.py [輸出檔案] [--format csv|parquet] [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+                          [--query 搜尋詞] [--target 目標關鍵字] [--columns 欄位1,欄位2]
+
+例如:
+    python rank_export.py rank_history.csv --since 2026-01-01 --until 2026-03-31
+    python rank_export.py rank_history.parquet --target Django --columns checked_at,search_query,page
+    python rank_export.py - --query "Python 教學"
+
+Parquet格式需要額外安裝 pyarrow:
+    pip install pyarrow
+"""
+
+import sys
+import csv
+import logging
+import argparse
+import datetime
+from pathlib import Path
+
+from rank_history import DEFAULT_HISTORY_DB, open_history_db
+
+# 設置日誌
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+EXPORT_COLUMNS = ["id", "run_id", "checked_at", "search_query", "target_keyword", "status", "page"]
+INTEGER_COLUMNS = {"id", "page"}
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def build_export_query(columns=None, since=None, until=None, search_query=None, target_keyword=None):
+    """
+    建立匯出用的SQL查詢
+
+    指定搜尋詞或目標關鍵字時依該關鍵字的索引讀取（按關鍵字、寫入順序排列），
+    只指定日期範圍時依 checked_at 索引讀取（按時間排列），否則按寫入順序讀取。
+
+    參數:
+        columns: 要匯出的欄位列表，預設為全部欄位
+        since, until: 日期範圍（YYYY-MM-DD，包含兩端）
+        search_query, target_keyword: 只匯出指定的搜尋詞或目標關鍵字
+
+    返回：(SQL, 參數列表)
+    """
+    columns = columns or EXPORT_COLUMNS
+    unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"未知的欄位: {', '.join(unknown)}")
+
+    conditions = []
+    params = []
+    if since:
+        conditions.append("checked_at >= ?")
+        params.append(datetime.date.fromisoformat(since).isoformat())
+    if until:
+        # 包含 until 當天
+        next_day = datetime.date.fromisoformat(until) + datetime.timedelta(days=1)
+        conditions.append("checked_at < ?")
+        params.append(next_day.isoformat())
+    if search_query:
+        conditions.append("search_query = ?")
+        params.append(search_query)
+    if target_keyword:
+        conditions.append("target_keyword = ?")
+        params.append(target_keyword)
+
+    # 排序須與驅動查詢的索引一致，SQLite 才能邊讀邊返回，不必先排序整個結果
+    if search_query:
+        index, order_by = "idx_rank_history_key", "target_keyword, id"
+    elif target_keyword:
+        index, order_by = "idx_rank_history_target", "search_query, id"
+    elif since or until:
+        index, order_by = "idx_rank_history_checked_at", "checked_at, id"
+    else:
+        index, order_by = None, "id"
+
+    sql = f"SELECT {', '.join(columns)} FROM rank_history"
+    if index:
+        sql += f" INDEXED BY {index}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {order_by}"
+    return sql, params
+
+
+def iter_history_chunks(conn, sql, params, chunk_size=DEFAULT_CHUNK_SIZE):
+    """分批執行查詢，返回產生元組列表的迭代器，每批最多 chunk_size 筆"""
+    cursor = conn.cursor()
+    # 直接使用元組，避免每筆記錄建立 Row 物件
+    cursor.row_factory = None
+    cursor.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+
+def write_csv(chunks, columns, output):
+    """將分批記錄寫入CSV，output 為 "-" 時寫到標準輸出，返回寫入筆數"""
+    total = 0
+    csvfile = sys.stdout if output == "-" else open(output, "w", encoding="utf-8-sig", newline="")
+    try:
+        writer = csv.writer(csvfile)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            total += len(rows)
+    finally:
+        if csvfile is not sys.stdout:
+            csvfile.close()
+    return total
+
+
+def write_parquet(chunks, columns, output):
+    """將分批記錄寫入Parquet（需要 pyarrow），每批寫成一個 row group，返回寫入筆數"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("匯出Parquet需要安裝 pyarrow，請執行: pip install pyarrow")
+
+    schema = pa.schema([
+        (column, pa.int64() if column in INTEGER_COLUMNS else pa.string())
+        for column in columns
+    ])
+    total = 0
+    with pq.ParquetWriter(output, schema) as writer:
+        for rows in chunks:
+            arrays = [
+                pa.array([row[i] for row in rows], type=schema.field(i).type)
+                for i in range(len(columns))
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            total += len(rows)
+    return total
+
+
+def parse_arguments():
+    """解析命令行參數"""
+    parser = argparse.ArgumentParser(description="排名歷史匯出工具")
+    parser.add_argument("output", help="輸出檔案路徑，CSV格式可用 - 表示標準輸出")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="輸出格式 (默認: 依副檔名判斷，否則為csv)")
+    parser.add_argument("--history-db", default=DEFAULT_HISTORY_DB, help=f"排名歷史資料庫路徑 (默認: {DEFAULT_HISTORY_DB})")
+    parser.add_argument("--since", help="起始日期 YYYY-MM-DD（包含）")
+    parser.add_argument("--until", help="結束日期 YYYY-MM-DD（包含）")
+    parser.add_argument("--query", help="只匯出指定的搜尋詞")
+    parser.add_argument("--target", help="只匯出指定的目標關鍵字")
+    parser.add_argument("--columns", help=f"要匯出的欄位，以逗號分隔 (默認: {','.join(EXPORT_COLUMNS)})")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help=f"每批讀取筆數 (默認: {DEFAULT_CHUNK_SIZE})")
+
+    return parser.parse_args()
+
+
+def main():
+    """主函數"""
+    args = parse_arguments()
+
+    output_format = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+    columns = [column.strip() for column in args.columns.split(",")] if args.columns else EXPORT_COLUMNS
+
+    if args.chunk_size <= 0:
+        print("❌ 每批讀取筆數必須是正整數")
+        sys.exit(1)
+    if output_format == "parquet" and args.output == "-":
+        print("❌ Parquet格式無法輸出到標準輸出")
+        sys.exit(1)
+    if not Path(args.history_db).exists():
+        print(f"❌ 找不到排名歷史資料庫: {args.history_db}")
+        sys.exit(1)
+
+    try:
+        sql, params = build_export_query(columns, args.since, args.until, args.query, args.target)
+    except ValueError as e:
+        print(f"❌ 匯出條件無效: {e}")
+        sys.exit(1)
+
+    conn = open_history_db(args.history_db)
+    try:
+        chunks = iter_history_chunks(conn, sql, params, args.chunk_size)
+        if output_format == "parquet":
+            total = write_parquet(chunks, columns, args.output)
+        else:
+            total = write_csv(chunks, columns, args.output)
+        logging.info(f"已匯出 {total} 筆記錄到 {args.output}")
+        if args.output != "-":
+            print(f"✓ 已匯出 {total} 筆記錄到 {args.output}")
+    except ImportError as e:
+        logging.error(f"匯出失敗: {e}")
+        print(f"❌ 匯出失敗: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
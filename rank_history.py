@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+排名歷史記錄
+
+將每次CSV批量搜索的結果追加到本地SQLite歷史資料庫，供排名提醒等功能查詢。
+資料表以 (搜尋詞, 目標關鍵字) 與批次編號建立索引，查詢單一關鍵字或單一批次時
+不需要掃描整個歷史。
+
+使用方法:
+    from rank_history import open_history_db, append_batch
+
+    conn = open_history_db("results/rank_history.db")
+    run_id = append_batch(conn, all_results_summary)
+"""
+
+import re
+import sqlite3
+import logging
+import datetime
+from pathlib import Path
+
+DEFAULT_HISTORY_DB = "results/rank_history.db"
+
+# 搜索結果狀態
+STATUS_FOUND = "found"
+STATUS_NOT_FOUND = "not_found"
+STATUS_ERROR = "error"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rank_history (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    checked_at TEXT NOT NULL,
+    search_query TEXT NOT NULL,
+    target_keyword TEXT NOT NULL,
+    status TEXT NOT NULL,
+    page INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_rank_history_key ON rank_history (search_query, target_keyword);
+CREATE INDEX IF NOT EXISTS idx_rank_history_run ON rank_history (run_id);
+CREATE INDEX IF NOT EXISTS idx_rank_history_checked_at ON rank_history (checked_at);
+CREATE INDEX IF NOT EXISTS idx_rank_history_target ON rank_history (target_keyword, search_query);
+"""
+
+# 壓縮保留策略預設值：最近14天全部保留，90天內每天保留一筆，更早的每週保留一筆
+DEFAULT_KEEP_ALL_DAYS = 14
+DEFAULT_KEEP_DAILY_DAYS = 90
+
+# 每個 (搜尋詞, 目標關鍵字) 在各時間區段內只保留最新的一筆，優先保留非錯誤記錄
+# 每週區段以該週星期一的日期表示，跨年的一週不會被拆成兩個區段
+_COMPACT_KEY_SQL = """
+DELETE FROM rank_history WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY bucket ORDER BY status = 'error', checked_at DESC, id DESC
+        ) AS rn
+        FROM (
+            SELECT id, status, checked_at,
+                CASE WHEN checked_at >= :weekly_cutoff THEN substr(checked_at, 1, 10)
+                     ELSE 'W' || date(checked_at, '-6 days', 'weekday 1') END AS bucket
+            FROM rank_history
+            WHERE search_query = :search_query AND target_keyword = :target_keyword
+                AND checked_at < :daily_cutoff
+        )
+    ) WHERE rn > 1
+)
+"""
+
+_FOUND_PATTERN = re.compile(r"在第 (\d+) 頁找到")
+_NOT_FOUND_PATTERN = re.compile(r"頁內未找到")
+
+
+def open_history_db(db_path=DEFAULT_HISTORY_DB):
+    """打開（必要時建立）歷史資料庫並返回連線"""
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    # 新資料庫啟用增量回收，壓縮後可在不鎖住讀取端的情況下釋放空間
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    # WAL模式讓讀取端在寫入期間仍可查詢
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def parse_result_status(result_value):
+    """
+    將 process_keyword_pair 產生的結果文字轉換為 (狀態, 頁數)
+
+    例如 "在第 3 頁找到並成功點擊" -> ("found", 3)，
+    "在 10 頁內未找到" -> ("not_found", None)，其他情況視為錯誤。
+    """
+    match = _FOUND_PATTERN.search(result_value)
+    if match:
+        return STATUS_FOUND, int(match.group(1))
+    if _NOT_FOUND_PATTERN.search(result_value):
+        return STATUS_NOT_FOUND, None
+    return STATUS_ERROR, None
+
+
+def new_run_id():
+    """產生批次編號"""
+    return datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+
+def append_batch(conn, results_summary, run_id=None, checked_at=None):
+    """
+    將一次批量搜索的結果摘要寫入歷史資料庫
+
+    參數:
+        conn: open_history_db 返回的連線
+        results_summary: {主要搜尋詞: {"搜尋詞 -> 目標關鍵字": 結果文字}}
+        run_id: 批次編號，預設自動產生
+        checked_at: ISO格式時間，預設為目前時間
+
+    返回：批次編號
+    """
+    run_id = run_id or new_run_id()
+    checked_at = checked_at or datetime.datetime.now().isoformat(timespec="seconds")
+
+    rows = []
+    for results_for_main_query in results_summary.values():
+        for result_key, result_value in results_for_main_query.items():
+            # 跳過整體失敗記錄（例如 "搜尋詞 -> 關鍵字 (overall)"），它們不對應任何目標關鍵字
+            if " -> " not in result_key or result_key.endswith(" (overall)"):
+                continue
+            search_query, target_keyword = result_key.split(" -> ", 1)
+            status, page = parse_result_status(str(result_value))
+            rows.append((run_id, checked_at, search_query, target_keyword, status, page))
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO rank_history (run_id, checked_at, search_query, target_keyword, status, page) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+    logging.info(f"已將 {len(rows)} 筆結果寫入排名歷史 (批次: {run_id})")
+    return run_id
+
+
+def fetch_run(conn, run_id):
+    """讀取指定批次的所有結果"""
+    return conn.execute(
+        "SELECT * FROM rank_history WHERE run_id = ? ORDER BY id", (run_id,)
+    ).fetchall()
+
+
+def fetch_previous(conn, row):
+    """讀取同一 (搜尋詞, 目標關鍵字) 在指定記錄之前最近一次的有效結果"""
+    return conn.execute(
+        "SELECT * FROM rank_history "
+        "WHERE search_query = ? AND target_keyword = ? AND id < ? AND status != ? "
+        "ORDER BY id DESC LIMIT 1",
+        (row["search_query"], row["target_keyword"], row["id"], STATUS_ERROR),
+    ).fetchone()
+
+
+def run_exists(conn, run_id):
+    """檢查指定批次是否存在於排名歷史"""
+    return conn.execute(
+        "SELECT 1 FROM rank_history WHERE run_id = ? LIMIT 1", (run_id,)
+    ).fetchone() is not None
+
+
+def latest_run_id(conn):
+    """返回最近一次寫入的批次編號"""
+    row = conn.execute("SELECT run_id FROM rank_history ORDER BY id DESC LIMIT 1").fetchone()
+    return row["run_id"] if row else None
+
+
+def compact_history(conn, keep_all_days=DEFAULT_KEEP_ALL_DAYS, keep_daily_days=DEFAULT_KEEP_DAILY_DAYS,
+                    full_vacuum=False, now=None):
+    """
+    依保留策略壓縮排名歷史
+
+    最近 keep_all_days 天的記錄全部保留，keep_daily_days 天內每個 (搜尋詞, 目標關鍵字)
+    每天保留最新一筆，更早的每週保留一筆。每個關鍵字在獨立的交易中處理，
+    記憶體與鎖定時間只與單一關鍵字的歷史長度有關，讀取端在WAL模式下不受影響。
+
+    參數:
+        full_vacuum: 是否執行完整 VACUUM 重建資料表與索引（期間會阻擋其他寫入）
+
+    返回：刪除的記錄數
+    """
+    if keep_daily_days < keep_all_days:
+        raise ValueError("每日保留天數不可小於完整保留天數")
+
+    now = now or datetime.datetime.now()
+    params = {
+        "daily_cutoff": (now - datetime.timedelta(days=keep_all_days)).isoformat(timespec="seconds"),
+        "weekly_cutoff": (now - datetime.timedelta(days=keep_daily_days)).isoformat(timespec="seconds"),
+    }
+
+    # 只載入需要壓縮的關鍵字清單，記錄本身逐個關鍵字處理
+    keys = conn.execute(
+        "SELECT DISTINCT search_query, target_keyword FROM rank_history WHERE checked_at < ?",
+        (params["daily_cutoff"],),
+    ).fetchall()
+    deleted = 0
+    for search_query, target_keyword in keys:
+        with conn:
+            cursor = conn.execute(
+                _COMPACT_KEY_SQL,
+                dict(params, search_query=search_query, target_keyword=target_keyword),
+            )
+            deleted += cursor.rowcount
+    logging.info(f"排名歷史壓縮完成，刪除 {deleted} 筆記錄")
+
+    if full_vacuum:
+        logging.info("執行完整 VACUUM...")
+        conn.execute("VACUUM")
+    elif conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+    else:
+        logging.info("此資料庫未啟用增量回收，如需釋放磁碟空間請使用完整 VACUUM")
+
+    # 更新索引統計資訊並截斷WAL檔案
+    conn.execute("PRAGMA optimize")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return deleted
+